@@ -82,6 +82,45 @@ async function callForm(url, formData) {
   return res.json();
 }
 
+function isAudioFile(f) {
+  return (f.type || "").startsWith("audio/") || /\.(mp3|wav|m4a|aac|ogg|flac|wma)$/i.test(f.name || "");
+}
+
+// Audio uploads: read Server-Sent Events for live transcription progress
+async function callAudioStream(url, formData) {
+  const res = await fetch(url, { method: "POST", body: formData });
+  if (!res.ok) {
+    const msg = await res.text();
+    throw new Error(msg || res.statusText);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf("\n\n")) !== -1) {
+      const block = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      const event = (block.match(/^event: (.*)$/m) || [])[1];
+      const data = JSON.parse((block.match(/^data: (.*)$/m) || [])[1] || "null");
+      if (event === "segment") {
+        const pct = data.progress != null ? `${data.progress}%` : `${Math.round(data.end)}s`;
+        statusEl.textContent = `Transcribing… ${pct}`;
+      } else if (event === "transcribed") {
+        statusEl.textContent = "Generating…";
+      } else if (event === "result") {
+        return data;
+      } else if (event === "error") {
+        throw new Error(data.detail || "Streaming failed");
+      }
+    }
+  }
+  throw new Error("Stream ended before a result was received.");
+}
+
 btn.addEventListener("click", async () => {
   resultSec.classList.add("hidden");
   statusEl.textContent = "Generating…";
@@ -112,7 +151,9 @@ btn.addEventListener("click", async () => {
       fd.append("max_words", String(max_words));
       fd.append("speaking_wpm", String(speaking_wpm));
       fd.append("include_timestamps", String(include_timestamps));
-      data = await callForm(`${apiBase}/generate/file`, fd);
+      data = isAudioFile(f)
+        ? await callAudioStream(`${apiBase}/generate/file/stream`, fd)
+        : await callForm(`${apiBase}/generate/file`, fd);
     }
     renderResult(data);
     statusEl.textContent = "Done.";
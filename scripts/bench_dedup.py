@@ -0,0 +1,91 @@
+# scripts/bench_dedup.py
+"""
+Insert/query throughput of the near-duplicate index on synthetic documents.
+
+  python -m scripts.bench_dedup --docs 1000000 --queries 2000
+
+Signatures are computed outside the timed insert/query sections and reported separately,
+so the numbers split hashing cost from index cost.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.utils.dedup import NearDupIndex, minhash_signature
+
+
+def make_doc(rng: random.Random, vocab, words: int) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+def perturb(rng: random.Random, text: str, vocab, rate: float) -> str:
+    # simulates syndication edits / boilerplate differences
+    words = text.split()
+    for i in range(len(words)):
+        if rng.random() < rate:
+            words[i] = rng.choice(vocab)
+    return " ".join(words)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--words", type=int, default=300, help="words per synthetic doc")
+    ap.add_argument("--batch", type=int, default=10_000)
+    ap.add_argument("--edit-rate", type=float, default=0.01, help="word substitution rate for near-dups")
+    ap.add_argument("--path", default=None, help="index file (default: temp file)")
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    vocab = [f"w{i}" for i in range(50_000)]
+    path = args.path or os.path.join(tempfile.mkdtemp(), "dedup_bench.sqlite")
+    index = NearDupIndex(path)
+
+    # Keep a sample of inserted docs to build near-duplicate queries from
+    sample_every = max(args.docs // args.queries, 1)
+    samples = []
+
+    hash_secs = insert_secs = 0.0
+    inserted = 0
+    while inserted < args.docs:
+        n = min(args.batch, args.docs - inserted)
+        batch = []
+        t0 = time.perf_counter()
+        for i in range(inserted, inserted + n):
+            text = make_doc(rng, vocab, args.words)
+            if i % sample_every == 0 and len(samples) < args.queries:
+                samples.append(text)
+            batch.append((NearDupIndex.text_key(text), minhash_signature(text)))
+        t1 = time.perf_counter()
+        index.add_many(batch)
+        t2 = time.perf_counter()
+        hash_secs += t1 - t0
+        insert_secs += t2 - t1
+        inserted += n
+        print(f"  inserted {inserted:>9,d}  ({n / (t2 - t1):,.0f} docs/s index-only)", flush=True)
+
+    print(f"insert: {args.docs / insert_secs:,.0f} docs/s index-only, "
+          f"{args.docs / hash_secs:,.0f} docs/s minhash-only")
+
+    near = [minhash_signature(perturb(rng, s, vocab, args.edit_rate)) for s in samples]
+    fresh = [minhash_signature(make_doc(rng, vocab, args.words)) for _ in range(len(samples))]
+
+    t0 = time.perf_counter()
+    hits = sum(1 for sig in near if index.query("", sig=sig))
+    t1 = time.perf_counter()
+    false_hits = sum(1 for sig in fresh if index.query("", sig=sig))
+    t2 = time.perf_counter()
+
+    q = len(near) + len(fresh)
+    print(f"query: {q / (t2 - t0):,.0f} queries/s  "
+          f"near-dup recall={hits / max(len(near), 1):.3f}  "
+          f"false-positive rate={false_hits / max(len(fresh), 1):.3f}")
+    print(f"index file: {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
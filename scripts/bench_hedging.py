@@ -0,0 +1,111 @@
+# scripts/bench_hedging.py
+"""
+Compare p50/p99 latency of generate_structured_script with and without hedging,
+using a fake Gemini backend with an injected latency distribution (no API calls).
+
+  python -m scripts.bench_hedging --requests 400 --concurrency 8
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.generation import gemini_client
+
+FAKE_SCRIPT = json.dumps({
+    "title": "Bench Episode",
+    "intro": "Hello.",
+    "segments": [{"heading": "One", "content": "Body text."}],
+    "outro": "Bye.",
+    "show_notes": ["note"],
+})
+
+SOURCE_TEXT = "word " * 200
+
+
+def make_fake_backend(median: float, sigma: float, stall_rate: float, stall_secs: float, bad_json_rate: float):
+    """
+    Log-normal latency around `median` seconds, plus occasional long stalls
+    (the tail hedging is meant to cut) and occasional non-JSON answers.
+    """
+    rng = random.Random(1234)
+
+    def backend(model_name: str, prompt: str) -> str:
+        delay = rng.lognormvariate(0.0, sigma) * median
+        if rng.random() < stall_rate:
+            delay += stall_secs
+        time.sleep(delay)
+        if rng.random() < bad_json_rate:
+            return "Sure! Here is your episode: ..."
+        return FAKE_SCRIPT
+
+    return backend
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(int(round(pct / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+def run(n: int, concurrency: int, hedge: bool, retries: int):
+    calls = {"count": 0}
+    inner = gemini_client._backend
+
+    def counting(model_name: str, prompt: str) -> str:
+        calls["count"] += 1
+        return inner(model_name, prompt)
+
+    gemini_client.set_backend(counting)
+
+    def one(_):
+        t0 = time.monotonic()
+        gemini_client.generate_structured_script(
+            SOURCE_TEXT, "gemini-1.5-flash", 1200, hedge=hedge, retries=retries
+        )
+        return time.monotonic() - t0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        lat = list(pool.map(one, range(n)))
+    gemini_client.set_backend(inner)
+    return lat, calls["count"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--median", type=float, default=0.05, help="median backend latency (sec)")
+    ap.add_argument("--sigma", type=float, default=0.4, help="log-normal shape")
+    ap.add_argument("--stall-rate", type=float, default=0.03)
+    ap.add_argument("--stall-secs", type=float, default=0.5)
+    ap.add_argument("--bad-json-rate", type=float, default=0.02)
+    ap.add_argument("--percentile", type=float, default=95.0, help="hedge deadline percentile")
+    ap.add_argument("--budget", type=float, default=10.0, help="max extra calls from hedging (%%)")
+    args = ap.parse_args()
+
+    gemini_client.HEDGE_MIN_DELAY = 0.0
+    gemini_client.HEDGE_PERCENTILE = args.percentile
+    gemini_client.HEDGE_BUDGET_PCT = args.budget
+
+    for label, hedge in (("no hedge", False), ("hedged", True)):
+        gemini_client.set_backend(make_fake_backend(
+            args.median, args.sigma, args.stall_rate, args.stall_secs, args.bad_json_rate
+        ))
+        gemini_client._latencies.clear()
+        gemini_client._hedge_stats.update(requests=0, hedges=0)
+        # warm the latency window so the hedge deadline is percentile-based from the start
+        run(gemini_client.HEDGE_MIN_SAMPLES, args.concurrency, hedge=False, retries=0)
+        lat, calls = run(args.requests, args.concurrency, hedge=hedge, retries=1)
+        print(
+            f"{label:>9}: p50={statistics.median(lat) * 1000:7.1f}ms "
+            f"p99={percentile(lat, 99) * 1000:7.1f}ms "
+            f"backend_calls/request={calls / args.requests:.2f}"
+        )
+    gemini_client.set_backend(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+# scripts/loadtest.py
+"""
+Offline load test: starts the FastAPI app with stub backends and drives mixed traffic.
+
+Stubs (installed in every uvicorn worker via create_app):
+  - fake Gemini   : log-normal latency, configurable output size
+  - fake Whisper  : sleeps audio_seconds * real-time factor, yields segments lazily
+  - fake YouTube  : returns a canned transcript
+  - local HTTP    : serves an article page for URL ingestion
+
+  python -m scripts.loadtest --workers 2 --concurrency 32 --duration 30 \\
+      --mix text=5,url=2,youtube=2,file=1,audio=1,audio_stream=1 --json report.json
+
+Reports throughput, latency percentiles (successful requests) and error rate/latency
+per endpoint, plus peak RSS of every server process. Linux-only for RSS (reads /proc).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+STUB_ENV = "LOADTEST_STUBS"
+
+WORDS = (
+    "the council approved a new budget for public transport after months of debate "
+    "and residents can expect more frequent buses longer opening hours and cheaper fares "
+    "starting next spring according to officials who spoke at the meeting on tuesday"
+).split()
+
+
+def _filler(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+# ---------- Stub backends (run inside the server process) ----------
+
+def _fake_gemini(cfg: Dict):
+    rng = random.Random()
+    rng_lock = threading.Lock()
+
+    def backend(model_name: str, prompt: str) -> str:
+        with rng_lock:
+            delay = rng.lognormvariate(0.0, cfg["gemini_sigma"]) * cfg["gemini_latency"]
+            segments = [
+                {"heading": f"Segment {i + 1}", "content": _filler(rng, cfg["gemini_segment_words"])}
+                for i in range(cfg["gemini_segments"])
+            ]
+        time.sleep(delay)
+        return json.dumps({
+            "title": "Load Test Episode",
+            "intro": "Welcome to the load test.",
+            "segments": segments,
+            "outro": "Thanks for listening.",
+            "show_notes": [f"Point {i + 1}" for i in range(5)],
+        })
+
+    return backend
+
+
+class _FakeWhisper:
+    """
+    Mimics WhisperModel.transcribe: returns (lazy segment generator, info).
+    Decoding time is audio_seconds * rtf, spread across segments.
+    """
+
+    def __init__(self, audio_seconds: float, rtf: float, segment_seconds: float = 5.0):
+        self.audio_seconds = audio_seconds
+        self.rtf = rtf
+        self.segment_seconds = segment_seconds
+
+    def transcribe(self, path, **kwargs):
+        info = SimpleNamespace(duration=self.audio_seconds, language=kwargs.get("language") or "en")
+        return self._segments(), info
+
+    def _segments(self):
+        rng = random.Random()
+        t = 0.0
+        while t < self.audio_seconds:
+            length = min(self.segment_seconds, self.audio_seconds - t)
+            time.sleep(length * self.rtf)
+            words = [rng.choice(WORDS) for _ in range(max(int(length * 2.5), 1))]
+            step = length / len(words)
+            yield SimpleNamespace(
+                start=t,
+                end=t + length,
+                text=" ".join(words),
+                words=[SimpleNamespace(word=w, start=t + i * step) for i, w in enumerate(words)],
+            )
+            t += length
+
+
+def install_stubs(cfg: Dict) -> None:
+    import src.main as main
+    from src.generation import gemini_client
+    from src.ingest import audio
+
+    gemini_client.set_backend(_fake_gemini(cfg))
+    audio.set_model(_FakeWhisper(cfg["whisper_audio_seconds"], cfg["whisper_rtf"]))
+    rng = random.Random()
+    main.fetch_youtube_transcript = lambda url, **kw: _filler(rng, cfg["source_words"])
+
+
+def create_app():
+    """
+    uvicorn factory: install stubs from $LOADTEST_STUBS, return the real app.
+    """
+    install_stubs(json.loads(os.environ[STUB_ENV]))
+    from src.main import app
+    return app
+
+
+# ---------- Local article server for URL ingestion ----------
+
+def _start_article_server(source_words: int) -> ThreadingHTTPServer:
+    rng = random.Random(0)
+    paragraphs = "".join(f"<p>{_filler(rng, 60)}.</p>" for _ in range(max(source_words // 60, 1)))
+    body = (
+        "<html><head><title>Budget approved</title></head><body><article>"
+        f"<h1>Council approves transport budget</h1>{paragraphs}</article></body></html>"
+    ).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------- Process RSS (Linux /proc) ----------
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def _process_tree(root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    out, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        out.append(pid)
+        stack.extend(children.get(pid, []))
+    return out
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, root: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.root = root
+        self.interval = interval
+        self.peak: Dict[int, float] = {}
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            for pid in _process_tree(self.root):
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    self.peak[pid] = max(self.peak.get(pid, 0.0), rss)
+            self._stop_evt.wait(self.interval)
+
+    def stop(self):
+        self._stop_evt.set()
+
+
+# ---------- Traffic ----------
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in {"text", "url", "youtube", "file", "audio", "audio_stream"}:
+            raise SystemExit(f"Unknown traffic kind: {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _one_request(client, kind: str, rng: random.Random, args, article_url: str) -> bool:
+    """
+    Send one request of `kind`; True if it succeeded.
+    """
+    common = {"model": "gemini-1.5-flash", "max_words": 1200, "speaking_wpm": 150, "include_timestamps": True}
+    if kind == "text":
+        resp = await client.post("/generate", json={**common, "text": _filler(rng, args.source_words)})
+        return resp.status_code == 200
+    if kind == "url":
+        resp = await client.post("/generate", json={**common, "url": f"{article_url}?r={rng.random()}"})
+        return resp.status_code == 200
+    if kind == "youtube":
+        # unique id per request so the ingest cache doesn't hide the fetch path
+        vid = "".join(rng.choice("abcdefghijkABCDEFGHIJK0123456789") for _ in range(11))
+        resp = await client.post("/generate/youtube", json={**common, "url": f"https://youtu.be/{vid}"})
+        return resp.status_code == 200
+    form = {k: str(v) for k, v in common.items()}
+    if kind == "file":
+        data = _filler(rng, args.source_words).encode("utf-8")
+        files = {"file": (f"doc-{rng.random()}.txt", data, "text/plain")}
+    else:
+        files = {"file": ("clip.wav", os.urandom(args.audio_bytes), "audio/wav")}
+    if kind == "audio_stream":
+        resp = await client.post("/generate/file/stream", data=form, files=files)
+        # errors after the stream starts arrive as an SSE "error" event, not a status code
+        return resp.status_code == 200 and "event: result" in resp.text
+    resp = await client.post("/generate/file", data=form, files=files)
+    return resp.status_code == 200
+
+
+async def _drive(base_url: str, args, mix: Dict[str, float], article_url: str):
+    import httpx
+
+    kinds, weights = list(mix), list(mix.values())
+    results: Dict[str, List] = {k: [] for k in kinds}   # kind -> [(latency, ok)]
+    deadline = time.monotonic() + args.duration
+    sent = 0
+
+    async def worker(seed: int):
+        nonlocal sent
+        rng = random.Random(seed)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+            while time.monotonic() < deadline and (not args.requests or sent < args.requests):
+                sent += 1
+                kind = rng.choices(kinds, weights)[0]
+                t0 = time.monotonic()
+                try:
+                    ok = await _one_request(client, kind, rng, args, article_url)
+                except httpx.HTTPError:
+                    ok = False
+                results[kind].append((time.monotonic() - t0, ok))
+
+    t0 = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return results, time.monotonic() - t0
+
+
+def _pct(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(round(pct / 100.0 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def _ms(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    return round(_pct(samples, pct) * 1000, 1)
+
+
+def _stats(rows: List, elapsed: float) -> Dict:
+    # Percentiles are over successful requests only; errors get their own p50
+    ok_lat = [lat for lat, ok in rows if ok]
+    err_lat = [lat for lat, ok in rows if not ok]
+    return {
+        "requests": len(rows),
+        "rps": round(len(rows) / elapsed, 2),
+        "error_rate": round(len(err_lat) / len(rows), 4),
+        "p50_ms": _ms(ok_lat, 50),
+        "p90_ms": _ms(ok_lat, 90),
+        "p99_ms": _ms(ok_lat, 99),
+        "error_p50_ms": _ms(err_lat, 50),
+    }
+
+
+def _summarize(results: Dict[str, List], elapsed: float) -> Dict:
+    report = {"elapsed_sec": round(elapsed, 2), "endpoints": {}}
+    everything = []
+    for kind, rows in results.items():
+        everything.extend(rows)
+        if rows:
+            report["endpoints"][kind] = _stats(rows, elapsed)
+    if everything:
+        report["total"] = _stats(everything, elapsed)
+    return report
+
+
+def _fmt_ms(value: Optional[float]) -> str:
+    return f"{value:8.1f}ms" if value is not None else f"{'-':>8}  "
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_healthy(base_url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    import httpx
+
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if proc.poll() is not None:
+            raise SystemExit("Server exited during startup.")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("Server did not become healthy in time.")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    ap.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    ap.add_argument("--requests", type=int, default=0, help="stop after N requests (0 = duration only)")
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout (sec)")
+    ap.add_argument("--mix", default="text=5,url=2,youtube=2,file=1,audio=1", help="kind=weight,...")
+    ap.add_argument("--source-words", type=int, default=600)
+    ap.add_argument("--audio-bytes", type=int, default=256 * 1024)
+    ap.add_argument("--gemini-latency", type=float, default=1.0, help="median fake Gemini latency (sec)")
+    ap.add_argument("--gemini-sigma", type=float, default=0.5, help="log-normal shape of that latency")
+    ap.add_argument("--gemini-segments", type=int, default=4)
+    ap.add_argument("--gemini-segment-words", type=int, default=200)
+    ap.add_argument("--whisper-audio-seconds", type=float, default=60.0)
+    ap.add_argument("--whisper-rtf", type=float, default=0.1, help="fake Whisper real-time factor")
+    ap.add_argument("--json", dest="json_out", default=None, help="also write the report here")
+    args = ap.parse_args()
+
+    mix = _parse_mix(args.mix)
+    stubs = {
+        "gemini_latency": args.gemini_latency,
+        "gemini_sigma": args.gemini_sigma,
+        "gemini_segments": args.gemini_segments,
+        "gemini_segment_words": args.gemini_segment_words,
+        "whisper_audio_seconds": args.whisper_audio_seconds,
+        "whisper_rtf": args.whisper_rtf,
+        "source_words": args.source_words,
+    }
+
+    article = _start_article_server(args.source_words)
+    article_url = f"http://127.0.0.1:{article.server_address[1]}/article"
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, STUB_ENV: json.dumps(stubs), "DEDUP_MODE": "off"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "scripts.loadtest:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    sampler = _RssSampler(proc.pid)
+    try:
+        _wait_healthy(base_url, proc)
+        sampler.start()
+        results, elapsed = asyncio.run(_drive(base_url, args, mix, article_url))
+    finally:
+        sampler.stop()
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        article.shutdown()
+
+    report = _summarize(results, elapsed)
+    report["config"] = {"workers": args.workers, "concurrency": args.concurrency, "mix": mix, "stubs": stubs}
+    report["peak_rss_mb"] = {str(pid): round(mb, 1) for pid, mb in sorted(sampler.peak.items())}
+
+    rows = list(report["endpoints"].items())
+    if "total" in report:
+        rows.append(("total", report["total"]))
+    for kind, row in rows:
+        print(f"{kind:>12}: {row['requests']:6d} req  {row['rps']:7.2f} rps  err={row['error_rate']:.2%}  "
+              f"p50={_fmt_ms(row['p50_ms'])}  p90={_fmt_ms(row['p90_ms'])}  p99={_fmt_ms(row['p99_ms'])}  "
+              f"err_p50={_fmt_ms(row['error_p50_ms'])}")
+    for pid, mb in report["peak_rss_mb"].items():
+        print(f"  pid {pid}: peak RSS {mb:.1f} MB")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,48 @@
 import os
-from typing import Dict, Any
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Optional
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 load_dotenv()
 
+# ---------- Hedging / retry settings (env-tunable) ----------
+# GEMINI_HEDGE=1 turns on hedged requests: if the primary call is slower than the
+# observed latency percentile, a second call goes to GEMINI_HEDGE_MODEL (or the same
+# model) and the first valid JSON wins.
+HEDGE_ENABLED = os.environ.get("GEMINI_HEDGE", "0").strip().lower() in {"1", "true", "yes"}
+HEDGE_PERCENTILE = float(os.environ.get("GEMINI_HEDGE_PERCENTILE", "95"))
+HEDGE_MODEL = os.environ.get("GEMINI_HEDGE_MODEL") or None
+HEDGE_MIN_DELAY = float(os.environ.get("GEMINI_HEDGE_MIN_DELAY", "0.5"))       # seconds
+HEDGE_INITIAL_DELAY = float(os.environ.get("GEMINI_HEDGE_INITIAL_DELAY", "8"))  # seconds, until we have samples
+HEDGE_MIN_SAMPLES = 20
+# Hedges may add at most this % of extra calls (over all hedge-enabled requests)
+HEDGE_BUDGET_PCT = float(os.environ.get("GEMINI_HEDGE_BUDGET_PCT", "10"))
+# Extra calls allowed when the model answers with something that isn't valid JSON
+JSON_RETRIES = int(os.environ.get("GEMINI_JSON_RETRIES", "1"))
+
+# Set on the scaffold returned when no call produced valid JSON (see is_fallback_script)
+FALLBACK_KEY = "_fallback"
+
+# Only used when hedging: primaries (and their re-issues) run here so the caller can
+# watch the deadline; hedges get their own small pool so they never queue behind primaries.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("GEMINI_MAX_WORKERS", "40")),
+    thread_name_prefix="gemini",
+)
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("GEMINI_HEDGE_WORKERS", "4")),
+    thread_name_prefix="gemini-hedge",
+)
+_latencies = deque(maxlen=500)   # recent call latencies (sec), feeds the hedge deadline
+_latencies_lock = threading.Lock()
+_hedge_stats = {"requests": 0, "hedges": 0}
+_hedge_stats_lock = threading.Lock()
+
 def configure_gemini():
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
@@ -38,31 +76,186 @@ SOURCE TEXT:
 \"\"\"{source_text}\"\"\"
 """
 
-def generate_structured_script(source_text: str, model_name: str, max_words: int) -> Dict[str, Any]:
-    if not source_text or not source_text.strip():
-        raise ValueError("Empty source_text")
-
+def _gemini_backend(model_name: str, prompt: str) -> str:
     configure_gemini()
     model = genai.GenerativeModel(model_name)
-    prompt = PROMPT_TEMPLATE.format(source_text=source_text[:20000], max_words=max_words)
     resp = model.generate_content(prompt)
+    return resp.text
+
+# (model_name, prompt) -> raw model text. Swappable for fakes in benchmarks/load tests.
+_backend: Callable[[str, str], str] = _gemini_backend
+
+def set_backend(fn: Optional[Callable[[str, str], str]] = None) -> None:
+    """
+    Replace the text-generation backend. Pass None to restore the real Gemini call.
+    """
+    global _backend
+    _backend = fn or _gemini_backend
+
+def _record_latency(seconds: float) -> None:
+    with _latencies_lock:
+        _latencies.append(seconds)
+
+def hedge_delay(percentile: Optional[float] = None) -> float:
+    """
+    Seconds to wait on the primary call before hedging: the given percentile of recent
+    latencies, floored at HEDGE_MIN_DELAY. Uses HEDGE_INITIAL_DELAY until enough samples.
+    """
+    if percentile is None:
+        percentile = HEDGE_PERCENTILE
+    with _latencies_lock:
+        samples = sorted(_latencies)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_INITIAL_DELAY
+    idx = min(int(round(percentile / 100.0 * (len(samples) - 1))), len(samples) - 1)
+    return max(samples[idx], HEDGE_MIN_DELAY)
+
+def _parse_script_json(txt: str) -> Optional[Dict[str, Any]]:
     # Gemini often returns code fences or stray text; try to parse robustly
-    txt = resp.text.strip()
+    txt = (txt or "").strip()
     # strip code fences if any
     if txt.startswith("```"):
         txt = txt.strip("`")
         # remove "json" hint if present
         txt = txt.replace("json\n", "").replace("json\r\n", "")
-    # Minimal safety: fall back to a lightweight scaffold on parse error
-    import json
     try:
         data = json.loads(txt)
     except Exception:
+        return None
+    return data if isinstance(data, dict) else None
+
+def _attempt(model_name: str, prompt: str, started: Optional[threading.Event] = None) -> Optional[Dict[str, Any]]:
+    if started is not None:
+        started.set()
+    t0 = time.monotonic()
+    txt = _backend(model_name, prompt)
+    _record_latency(time.monotonic() - t0)
+    return _parse_script_json(txt)
+
+def _take_hedge_budget() -> bool:
+    """
+    Count one hedge-enabled request; True if a hedge still fits in HEDGE_BUDGET_PCT.
+    """
+    with _hedge_stats_lock:
+        if (_hedge_stats["hedges"] + 1) * 100.0 > HEDGE_BUDGET_PCT * _hedge_stats["requests"]:
+            return False
+        _hedge_stats["hedges"] += 1
+        return True
+
+def _request_inline(prompt: str, model_name: str, retries: int) -> Optional[Dict[str, Any]]:
+    # No hedging: call in the caller's thread, re-issuing unparseable answers to the same model
+    for _ in range(max(retries, 0) + 1):
+        data = _attempt(model_name, prompt)
+        if data is not None:
+            return data
+    return None
+
+def _request_hedged(
+    prompt: str,
+    model_name: str,
+    hedge_model: Optional[str],
+    retries: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Run the primary on the pool and, if it hasn't answered hedge_delay() after it
+    actually started, fire one hedge (to hedge_model or the same model) on the hedge
+    pool, budget permitting; whichever returns valid JSON first wins.
+    An unparseable answer is re-issued to the model that produced it, same as the
+    unhedged path, so GEMINI_HEDGE_MODEL only ever receives hedges.
+    Losers are cancelled if still queued; a call already in flight can't be interrupted,
+    so its result is simply dropped.
+    Returns None if nothing parsed; re-raises the backend error if every call failed.
+    """
+    with _hedge_stats_lock:
+        _hedge_stats["requests"] += 1
+
+    alt_model = hedge_model or model_name
+    started = threading.Event()
+    primary = _executor.submit(_attempt, model_name, prompt, started)
+    pending = {primary}
+    model_of = {primary: model_name}   # future -> model it called
+    # Deadline counts from when the backend call starts, not from queueing
+    started.wait()
+    hedge_at: Optional[float] = time.monotonic() + hedge_delay()
+    retries_left = max(retries, 0)
+    parsed_any = False
+    last_error: Optional[BaseException] = None
+
+    while pending:
+        timeout = None if hedge_at is None else max(hedge_at - time.monotonic(), 0.0)
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            # Primary is slower than usual: hedge once, if the budget allows
+            hedge_at = None
+            if _take_hedge_budget():
+                hedge_fut = _hedge_executor.submit(_attempt, alt_model, prompt)
+                model_of[hedge_fut] = alt_model
+                pending.add(hedge_fut)
+            continue
+
+        for fut in done:
+            if fut is primary:
+                hedge_at = None   # primary answered: no point hedging any more
+            try:
+                data = fut.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if data is not None:
+                for other in pending:
+                    other.cancel()
+                return data
+            parsed_any = True
+            if retries_left > 0:
+                # Got an answer but not valid JSON: re-issue instead of giving up
+                retries_left -= 1
+                retry_fut = _executor.submit(_attempt, model_of[fut], prompt)
+                model_of[retry_fut] = model_of[fut]
+                pending.add(retry_fut)
+
+    if last_error is not None and not parsed_any:
+        raise last_error
+    return None
+
+def generate_structured_script(
+    source_text: str,
+    model_name: str,
+    max_words: int,
+    *,
+    hedge: Optional[bool] = None,
+    hedge_model: Optional[str] = None,
+    retries: Optional[int] = None,
+) -> Dict[str, Any]:
+    if not source_text or not source_text.strip():
+        raise ValueError("Empty source_text")
+
+    prompt = PROMPT_TEMPLATE.format(source_text=source_text[:20000], max_words=max_words)
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    retries = JSON_RETRIES if retries is None else retries
+    if hedge:
+        data = _request_hedged(
+            prompt,
+            model_name,
+            hedge_model if hedge_model is not None else HEDGE_MODEL,
+            retries,
+        )
+    else:
+        data = _request_inline(prompt, model_name, retries)
+    # Minimal safety: fall back to a lightweight scaffold when nothing parsed
+    if data is None:
         data = {
             "title": "Podcast Episode",
             "intro": "Welcome to our show! Here's what we're covering today.",
             "segments": [{"heading": "Main Discussion", "content": source_text[:600]}],
             "outro": "Thanks for listening! Subscribe for more.",
-            "show_notes": []
+            "show_notes": [],
+            FALLBACK_KEY: True,
         }
-    return data
\ No newline at end of file
+    return data
+
+def is_fallback_script(data: Dict[str, Any]) -> bool:
+    """
+    True if `data` is the placeholder scaffold rather than a real model answer.
+    """
+    return bool(data.get(FALLBACK_KEY))
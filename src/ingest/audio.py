@@ -1,37 +1,54 @@
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, AsyncIterator, Dict, Any
 from fastapi import UploadFile
 from faster_whisper import WhisperModel
+import asyncio
+import threading
 import tempfile
 import os
 
-# Lazy singleton model
+# Lazy singleton model (loaded from worker threads, so guard against double loads)
 _model: Optional[WhisperModel] = None
+_model_lock = threading.Lock()
 
 def _get_model() -> WhisperModel:
     global _model
     if _model is None:
-        # "base" + int8 is a good CPU default. Try "small" or "medium" for higher quality.
-        _model = WhisperModel("base", compute_type="int8")
+        with _model_lock:
+            if _model is None:
+                # "base" + int8 is a good CPU default. Try "small" or "medium" for higher quality.
+                _model = WhisperModel("base", compute_type="int8")
     return _model
 
-async def transcribe_audio(file: UploadFile, language: Optional[str] = None):
+def set_model(model: Optional[WhisperModel] = None) -> None:
     """
-    Returns:
-      {
-        "text": str,
-        "duration": float (sec),
-        "words": List[Tuple[str, float]]  # (word_lower, start_time_sec)
-      }
+    Replace the transcription model (e.g. a stub for load tests). Pass None to go
+    back to the lazily loaded faster-whisper model.
     """
-    model = _get_model()
+    global _model
+    with _model_lock:
+        _model = model
 
-    # Save to a temp file because faster-whisper expects a path/stream
+async def save_upload(file: UploadFile) -> str:
+    """
+    Save the upload to a temp file (faster-whisper expects a path/stream).
+    Caller owns the returned path.
+    """
     suffix = os.path.splitext(file.filename or "")[1] or ".wav"
     with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
         data = await file.read()
         tmp.write(data)
-        temp_path = tmp.name
+        return tmp.name
+
+def remove_upload(path: str) -> None:
+    """
+    Delete a file from save_upload; a missing file is fine.
+    """
+    try:
+        os.unlink(path)
+    except Exception:
+        pass
 
+def _normalize_language(language: Optional[str]) -> Optional[str]:
     # sanitize language input
     lang = (language or "").strip().lower() or None
     # quick friendly mappings
@@ -41,52 +58,137 @@ async def transcribe_audio(file: UploadFile, language: Optional[str] = None):
     }
     if lang in human_map:
         lang = human_map[lang]
+    return lang
 
+def _start_transcription(model: WhisperModel, path: str, lang: Optional[str]):
+    """
+    Returns (lazy segment generator, info). Decoding happens as segments are iterated.
+    """
     try:
+        return model.transcribe(
+            path,
+            word_timestamps=True,
+            language=lang,   # e.g., "en", "hi"; or None to auto-detect
+            vad_filter=True,
+        )
+    except ValueError:
+        # invalid language code → retry with auto-detect
+        return model.transcribe(
+            path,
+            word_timestamps=True,
+            language=None,
+            vad_filter=True,
+        )
+
+def _segment_words(seg) -> List[Tuple[str, float]]:
+    words: List[Tuple[str, float]] = []
+    if seg.words:
+        for w in seg.words:
+            if w.start is not None and w.word.strip():
+                words.append((w.word.strip().lower(), float(w.start)))
+    return words
+
+async def transcribe_audio(file: UploadFile, language: Optional[str] = None):
+    """
+    Returns:
+      {
+        "text": str,
+        "duration": float (sec),
+        "words": List[Tuple[str, float]]  # (word_lower, start_time_sec)
+      }
+    Decoding runs in a worker thread (via stream_transcription), so the event loop
+    stays free while faster-whisper works.
+    """
+    temp_path = await save_upload(file)
+    done: Dict[str, Any] = {}
+    async for ev in stream_transcription(temp_path, language=language):
+        if ev["type"] == "done":
+            done = ev
+    return {
+        "text": done["text"],
+        "duration": done["duration"],
+        "words": done["words"],
+    }
+
+async def stream_transcription(temp_path: str, language: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Transcribe in a worker thread and yield events as segments are decoded:
+      {"type": "segment", "start", "end", "text", "progress"}   # progress: % of info.duration
+      {"type": "done", "text", "duration", "words"}             # same shape as transcribe_audio
+    Takes ownership of temp_path (deleted when decoding stops). If the consumer stops
+    early (e.g. client disconnect), decoding halts at the next segment boundary.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancel = threading.Event()
+    finished = object()
+
+    def put(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # event loop already gone
+
+    def work() -> None:
+        segments = None
         try:
-            segments, info = model.transcribe(
-                temp_path,
-                word_timestamps=True,
-                language=lang,   # e.g., "en", "hi"; or None to auto-detect
-                vad_filter=True,
-            )
-        except ValueError:
-            # invalid language code → retry with auto-detect
-            segments, info = model.transcribe(
-                temp_path,
-                word_timestamps=True,
-                language=None,
-                vad_filter=True,
-            )
-
-        words: List[Tuple[str, float]] = []
-        full_text_parts: List[str] = []
-
-        for seg in segments:
+            segments, info = _start_transcription(_get_model(), temp_path, _normalize_language(language))
+            put(("info", float(getattr(info, "duration", 0.0) or 0.0)))
+            for seg in segments:
+                if cancel.is_set():
+                    break
+                put(("segment", seg))
+        except BaseException as e:
+            put(("error", e))
+        finally:
+            close = getattr(segments, "close", None)
+            if close:
+                close()
+            remove_upload(temp_path)
+            put(finished)
+
+    loop.run_in_executor(None, work)
+
+    words: List[Tuple[str, float]] = []
+    seg_starts: List[Tuple[str, float]] = []
+    full_text_parts: List[str] = []
+    duration = 0.0
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            kind, value = item
+            if kind == "error":
+                raise value
+            if kind == "info":
+                duration = value
+                continue
+
+            seg = value
             txt = (seg.text or "").strip()
             if txt:
                 full_text_parts.append(txt)
-            if seg.words:
-                for w in seg.words:
-                    if w.start is not None and w.word.strip():
-                        words.append((w.word.strip().lower(), float(w.start)))
+            words.extend(_segment_words(seg))
+            first = txt.split()
+            seg_starts.append(((first[0].lower() if first else ""), float(seg.start)))
 
-        transcript_text = " ".join(full_text_parts).strip()
-        duration = float(getattr(info, "duration", 0.0) or 0.0)
+            end = float(seg.end)
+            progress = min(100.0, 100.0 * end / duration) if duration > 0 else None
+            yield {
+                "type": "segment",
+                "start": float(seg.start),
+                "end": end,
+                "text": txt,
+                "progress": round(progress, 1) if progress is not None else None,
+            }
+    finally:
+        cancel.set()
 
+    yield {
+        "type": "done",
+        "text": " ".join(full_text_parts).strip(),
+        "duration": duration,
         # Fallback: if no word-level timings, approximate with segment starts
-        if not words:
-            for seg in segments:
-                first = (seg.text or "").strip().split()
-                words.append(((first[0].lower() if first else ""), float(seg.start)))
-
-        return {
-            "text": transcript_text,
-            "duration": duration,
-            "words": words,
-        }
-    finally:
-        try:
-            os.unlink(temp_path)
-        except Exception:
-            pass
\ No newline at end of file
+        "words": words or seg_starts,
+    }
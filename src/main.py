@@ -1,13 +1,21 @@
+import json
+import logging
+from typing import Optional
+
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from src.schemas import GenerateRequest, GenerateResponse, Segment, ShowNote
 from src.ingest.fetch import fetch_text_from_url, clean_text
 from src.ingest.youtube import fetch_youtube_transcript
 from src.ingest.files import read_any
-from src.generation.gemini_client import generate_structured_script
+from src.generation.gemini_client import generate_structured_script, is_fallback_script
 from src.utils.cache import ingest_cache
-from src.ingest.audio import transcribe_audio
+from src.utils import dedup
+from src.ingest.audio import transcribe_audio, save_upload, remove_upload, stream_transcription
 from src.utils.timestamps import (
     estimate_segment_durations,
     cumulative_timestamps,
@@ -18,6 +26,8 @@ from src.utils.timestamps import (
     distribute_bullets_over_segments
 )
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Podcast Episode Script Generator")
 app.add_middleware(
     CORSMiddleware,
@@ -42,6 +52,13 @@ def _generate_from_source_text(source_text: str, payload: GenerateRequest) -> Ge
             detail=f"Source text is too short after cleaning (need at least {MIN_WORDS} words)."
         )
 
+    # Near-duplicate of a source we already generated for? (DEDUP_MODE=reuse|warn)
+    dedup_params = f"{payload.model}|{payload.max_words}|{payload.speaking_wpm}|{payload.include_timestamps}"
+    dedup_sig = dedup.source_signature(source_text)   # None when dedup is off
+    reused = dedup.find_reusable(source_text, dedup_params, sig=dedup_sig)
+    if reused:
+        return GenerateResponse(**reused)
+
     data = generate_structured_script(source_text, payload.model, payload.max_words)
 
     segments = [Segment(**s) for s in data.get("segments", [])]
@@ -72,13 +89,92 @@ def _generate_from_source_text(source_text: str, payload: GenerateRequest) -> Ge
         notes_dicts = snap_notes_to_segments(notes_dicts, seg_start_list)
         show_notes = [ShowNote(time=n["time"], note=n["note"]) for n in notes_dicts]
 
-    return GenerateResponse(
+    resp = GenerateResponse(
         title=title,
         intro=intro,
         segments=segments,
         outro=outro,
         show_notes=show_notes,
     )
+    # Never persist the placeholder scaffold: later near-duplicates would get it forever
+    if not is_fallback_script(data):
+        dedup.remember(source_text, dedup_params, resp.model_dump(), sig=dedup_sig)
+    return resp
+
+
+def _is_audio(file: UploadFile) -> bool:
+    name = (file.filename or "").lower()
+    ct = (file.content_type or "").lower()
+    if ct.startswith("audio/"):
+        return True
+    for ext in (".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac", ".wma"):
+        if name.endswith(ext):
+            return True
+    return False
+
+
+def _clean_language(language: Optional[str]) -> Optional[str]:
+    lang = (language or "").strip().lower()
+    if lang in {"", "string", "none", "null"}:
+        lang = None
+    alias = {"english": "en", "hindi": "hi", "hin": "hi", "en-us": "en", "en-gb": "en", "en-in": "en"}
+    return alias.get(lang, lang) or None
+
+
+def _generate_from_transcript(
+    tx: dict,
+    model: str,
+    max_words: int,
+    speaking_wpm: int,
+    include_timestamps: bool,
+) -> GenerateResponse:
+    source_text = tx["text"]
+    words_timeline = tx["words"]      # [(word_lower, start_sec), ...]
+    duration = tx["duration"]
+
+    # Disable timestamps in helper to avoid duplicates; we add audio-true stamps below
+    payload = GenerateRequest(
+        url=None,
+        text=source_text,
+        model=model,
+        max_words=max_words,
+        speaking_wpm=speaking_wpm,
+        include_timestamps=False,
+    )
+
+    resp = _generate_from_source_text(source_text, payload)
+
+    if include_timestamps and resp.segments and words_timeline:
+        # Audio-true chapter markers
+        seg_texts = [s.content for s in resp.segments]
+        audio_starts = map_segments_to_audio_starts(
+            words_timeline, seg_texts, intro_text=resp.intro
+        )
+
+        # 1) Chapter markers from *audio*
+        chapter_notes = [ShowNote(time=t, note=seg.heading) for t, seg in zip(audio_starts, resp.segments)]
+
+        # 2) Evenly distribute model bullets across segments (at their start times)
+        raw_bullets = [{"note": n.note} for n in resp.show_notes]  # model bullets have no time
+        distributed = distribute_bullets_over_segments(raw_bullets, audio_starts)
+        bullet_notes = [ShowNote(time=d["time"], note=d["note"]) for d in distributed]
+
+        # 3) Build final notes: Intro, bullets (now timed), chapters, Outro
+        final_notes = [ShowNote(time="00:00:00", note="Intro")] + bullet_notes + chapter_notes
+        final_notes.append(
+            ShowNote(
+                time=outro_time_from_audio(words_timeline, total_duration_fallback=duration),
+                note="Outro",
+            )
+        )
+
+        resp.show_notes = final_notes
+
+    return resp
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 # ---------- Public routes ----------
@@ -122,70 +218,14 @@ async def generate_from_file(
     include_timestamps: bool = Form(True),
     language: str = Form(None),   # optional: "en", "hi", etc.
 ):
-    name = (file.filename or "").lower()
-    ct = (file.content_type or "").lower()
-
-    def is_audio() -> bool:
-        if ct.startswith("audio/"):
-            return True
-        for ext in (".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac", ".wma"):
-            if name.endswith(ext):
-                return True
-        return False
-
     # -------------------- AUDIO PATH --------------------
-    if is_audio():
-        lang = (language or "").strip().lower()
-        if lang in {"", "string", "none", "null"}:
-            lang = None
-        alias = {"english": "en", "hindi": "hi", "hin": "hi", "en-us": "en", "en-gb": "en", "en-in": "en"}
-        lang = alias.get(lang, lang) or None
-
-        tx = await transcribe_audio(file, language=lang)
-        source_text = tx["text"]
-        words_timeline = tx["words"]      # [(word_lower, start_sec), ...]
-        duration = tx["duration"]
-
-        # Disable timestamps in helper to avoid duplicates; we add audio-true stamps below
-        payload = GenerateRequest(
-            url=None,
-            text=source_text,
-            model=model,
-            max_words=max_words,
-            speaking_wpm=speaking_wpm,
-            include_timestamps=False,
+    if _is_audio(file):
+        tx = await transcribe_audio(file, language=_clean_language(language))
+        # Keep the event loop free (open SSE streams share it) while Gemini runs
+        return await run_in_threadpool(
+            _generate_from_transcript, tx, model, max_words, speaking_wpm, include_timestamps
         )
 
-        resp = _generate_from_source_text(source_text, payload)
-
-        if include_timestamps and resp.segments and words_timeline:
-            # Audio-true chapter markers
-            seg_texts = [s.content for s in resp.segments]
-            audio_starts = map_segments_to_audio_starts(
-                words_timeline, seg_texts, intro_text=resp.intro
-            )
-
-            # 1) Chapter markers from *audio*
-            chapter_notes = [ShowNote(time=t, note=seg.heading) for t, seg in zip(audio_starts, resp.segments)]
-
-            # 2) Evenly distribute model bullets across segments (at their start times)
-            raw_bullets = [{"note": n.note} for n in resp.show_notes]  # model bullets have no time
-            distributed = distribute_bullets_over_segments(raw_bullets, audio_starts)
-            bullet_notes = [ShowNote(time=d["time"], note=d["note"]) for d in distributed]
-
-            # 3) Build final notes: Intro, bullets (now timed), chapters, Outro
-            final_notes = [ShowNote(time="00:00:00", note="Intro")] + bullet_notes + chapter_notes
-            final_notes.append(
-                ShowNote(
-                    time=outro_time_from_audio(words_timeline, total_duration_fallback=duration),
-                    note="Outro",
-                )
-            )
-
-            resp.show_notes = final_notes
-
-        return resp
-
     # -------------------- NON-AUDIO PATH (txt/pdf) --------------------
     content = await read_any(file)
     if not content:
@@ -209,7 +249,63 @@ async def generate_from_file(
         speaking_wpm=speaking_wpm,
         include_timestamps=include_timestamps,
     )
-    return _generate_from_source_text(content, payload)
+    # Gemini + dedup work: keep it off the event loop like the audio path
+    return await run_in_threadpool(_generate_from_source_text, content, payload)
+
+
+@app.post("/generate/file/stream")
+async def generate_from_file_stream(
+    file: UploadFile = File(...),
+    model: str = Form("gemini-1.5-flash"),
+    max_words: int = Form(1200),
+    speaking_wpm: int = Form(150),
+    include_timestamps: bool = Form(True),
+    language: str = Form(None),   # optional: "en", "hi", etc.
+):
+    """
+    Server-Sent Events for audio uploads:
+      event: segment      {"start", "end", "text", "progress"}  as faster-whisper decodes
+      event: transcribed  {"duration", "word_count"}
+      event: result       GenerateResponse
+      event: error        {"status", "detail"}
+    Disconnecting mid-transcription stops decoding at the next segment.
+    """
+    if not _is_audio(file):
+        raise HTTPException(status_code=422, detail="Streaming is only available for audio uploads.")
+
+    lang = _clean_language(language)
+    # The upload is closed once this handler returns, so spool it to disk first
+    temp_path = await save_upload(file)
+
+    async def events():
+        try:
+            tx = None
+            async for ev in stream_transcription(temp_path, language=lang):
+                if ev["type"] == "segment":
+                    yield _sse("segment", {k: ev[k] for k in ("start", "end", "text", "progress")})
+                else:
+                    tx = ev
+            yield _sse("transcribed", {"duration": tx["duration"], "word_count": len(tx["words"])})
+
+            resp = await run_in_threadpool(
+                _generate_from_transcript, tx, model, max_words, speaking_wpm, include_timestamps
+            )
+            yield _sse("result", resp.model_dump())
+        except HTTPException as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail})
+        except Exception:
+            logger.exception("Streaming generation failed")
+            yield _sse("error", {"status": 500, "detail": "Internal error while generating the episode."})
+        finally:
+            remove_upload(temp_path)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # events() never runs if the client is gone before streaming starts
+        background=BackgroundTask(remove_upload, temp_path),
+    )
 
     # uvicorn src.main:app --reload
     # python -m http.server 5500 -> http://127.0.0.1:5500
\ No newline at end of file
@@ -0,0 +1,259 @@
+# src/utils/dedup.py
+"""
+Near-duplicate source detection (MinHash + LSH) backed by SQLite.
+
+The same story often arrives under different URLs (tracking params, AMP pages,
+syndicated copies, re-uploaded PDFs), so exact-key caches never hit. We keep a
+MinHash signature per cleaned source text and bucket it into LSH bands; a lookup
+only touches docs that share a band bucket, so it stays sublinear in corpus size.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# off  -> no lookups/inserts
+# reuse -> return the stored generation of a near-duplicate source
+# warn -> log the near-duplicate, regenerate anyway
+DEDUP_MODE = os.environ.get("DEDUP_MODE", "off").strip().lower()
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+DEDUP_PATH = os.environ.get("DEDUP_PATH", os.path.join(".cache", "dedup.sqlite"))
+
+NUM_PERM = 128
+BANDS = 16            # 16 bands x 8 rows -> candidate threshold ~0.7 Jaccard
+SHINGLE_WORDS = 5
+# Only the start of a source is fingerprinted: the prompt sees source_text[:20000] too,
+# so text past that point can't change the generation we'd reuse.
+MAX_TEXT_CHARS = 20000
+_HASH_CHUNK = 4096    # shingles per permutation block, bounds the temp matrix to ~4 MB
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9']+", (text or "").lower())
+    if len(words) <= SHINGLE_WORDS:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature (uint32[NUM_PERM]) of the word 5-gram shingles of the first
+    MAX_TEXT_CHARS of `text`.
+    """
+    shingles = set(_shingles((text or "")[:MAX_TEXT_CHARS]))
+    sig = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    if not shingles:
+        return sig.astype(np.uint32)
+    hv = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    for i in range(0, len(hv), _HASH_CHUNK):
+        chunk = hv[i:i + _HASH_CHUNK]
+        # uint64 overflow wraps, which is fine for hashing purposes
+        with np.errstate(over="ignore"):
+            phv = (np.outer(_PERM_A, chunk) + _PERM_B[:, None]) % _MERSENNE_PRIME
+        np.minimum(sig, (phv & _MAX_HASH).min(axis=1), out=sig)
+    return sig.astype(np.uint32)
+
+
+def estimate_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """
+    Estimated Jaccard similarity between two MinHash signatures.
+    """
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def _band_buckets(sig: np.ndarray) -> List[int]:
+    rows = NUM_PERM // BANDS
+    buckets = []
+    for b in range(BANDS):
+        h = hashlib.blake2b(sig[b * rows:(b + 1) * rows].tobytes(), digest_size=8, salt=b.to_bytes(2, "little"))
+        buckets.append(int.from_bytes(h.digest(), "little", signed=True))  # fits SQLite INTEGER
+    return buckets
+
+
+class NearDupIndex:
+    """
+    Persistent MinHash/LSH index. Each doc is keyed by the sha1 of its text and can
+    carry stored results (e.g. a generated episode) per parameter set.
+    """
+
+    def __init__(self, path: str = DEDUP_PATH, threshold: float = DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, sig BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS bands (bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "doc_id INTEGER NOT NULL, params TEXT NOT NULL, payload TEXT NOT NULL, "
+                "PRIMARY KEY (doc_id, params))"
+            )
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def _insert(self, key: str, sig: np.ndarray) -> int:
+        row = self._conn.execute("SELECT id FROM docs WHERE key = ?", (key,)).fetchone()
+        if row:
+            return row[0]
+        cur = self._conn.execute("INSERT INTO docs (key, sig) VALUES (?, ?)", (key, sig.tobytes()))
+        doc_id = cur.lastrowid
+        self._conn.executemany(
+            "INSERT INTO bands (bucket, doc_id) VALUES (?, ?)",
+            [(bucket, doc_id) for bucket in _band_buckets(sig)],
+        )
+        return doc_id
+
+    def add(self, text: str, sig: Optional[np.ndarray] = None) -> int:
+        """
+        Index `text` (no-op if the exact text is already indexed). Returns its doc id.
+        """
+        sig = minhash_signature(text) if sig is None else sig
+        with self._lock, self._conn:
+            return self._insert(self.text_key(text), sig)
+
+    def add_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        """
+        Bulk insert of (key, signature) pairs in a single transaction.
+        """
+        with self._lock, self._conn:
+            for key, sig in items:
+                self._insert(key, sig)
+
+    def query(self, text: str, sig: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        All (doc_id, estimated_similarity) at or above the threshold, most similar first.
+        """
+        sig = minhash_signature(text) if sig is None else sig
+        buckets = _band_buckets(sig)
+        marks = ",".join("?" * len(buckets))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, sig FROM docs WHERE id IN (SELECT DISTINCT doc_id FROM bands WHERE bucket IN ({marks}))",
+                buckets,
+            ).fetchall()
+        matches = []
+        for doc_id, blob in rows:
+            sim = estimate_similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+            if sim >= self.threshold:
+                matches.append((doc_id, sim))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def get_result(self, doc_id: int, params: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM results WHERE doc_id = ? AND params = ?", (doc_id, params)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_result(self, doc_id: int, params: str, payload: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (doc_id, params, payload) VALUES (?, ?, ?)",
+                (doc_id, params, json.dumps(payload)),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Lazy singleton index
+_index: Optional[NearDupIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> Optional[NearDupIndex]:
+    global _index
+    if DEDUP_MODE not in {"reuse", "warn"}:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex()
+    return _index
+
+
+def source_signature(source_text: str) -> Optional[np.ndarray]:
+    """
+    Signature to hand to find_reusable/remember so it's computed once per request;
+    None when dedup is off.
+    """
+    if DEDUP_MODE not in {"reuse", "warn"}:
+        return None
+    return minhash_signature(source_text)
+
+
+def find_reusable(source_text: str, params: str, sig: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+    """
+    Stored result for `params` of the most similar near-duplicate source that has one,
+    if dedup is in "reuse" mode. In "warn" mode the match is only logged and None is
+    returned. Best-effort: index errors are logged and treated as a miss.
+    """
+    try:
+        index = get_index()
+        if index is None:
+            return None
+        matches = index.query(source_text, sig=sig)
+        if not matches:
+            return None
+        if DEDUP_MODE == "warn":
+            doc_id, sim = matches[0]
+            logger.warning("Near-duplicate source (doc %s, similarity %.2f); regenerating.", doc_id, sim)
+            return None
+        for doc_id, _ in matches:
+            result = index.get_result(doc_id, params)
+            if result is not None:
+                return result
+    except (sqlite3.Error, OSError, ValueError):
+        logger.exception("Near-duplicate lookup failed; generating without it.")
+    return None
+
+
+def remember(
+    source_text: str,
+    params: str,
+    payload: Dict[str, Any],
+    sig: Optional[np.ndarray] = None,
+) -> None:
+    """
+    Index `source_text` and store `payload` for `params` (no-op when dedup is off).
+    Best-effort: index errors are logged, never raised.
+    """
+    try:
+        index = get_index()
+        if index is None:
+            return
+        doc_id = index.add(source_text, sig=sig)
+        index.put_result(doc_id, params, payload)
+    except (sqlite3.Error, OSError, ValueError):
+        logger.exception("Could not store generation in the near-duplicate index.")
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.generation import gemini_client
+from src.ingest import audio
+from src.main import app
+from src.utils.timestamps import hhmmss
+
+EPISODE = json.dumps({
+    "title": "Episode",
+    "intro": "Hello there.",
+    "segments": [{"heading": "One", "content": "first part"}, {"heading": "Two", "content": "second part"}],
+    "outro": "Bye.",
+    "show_notes": ["a", "b"],
+})
+
+
+class FakeWhisper:
+    """
+    Lazy segments like faster-whisper; word_timestamps can be switched off.
+    """
+
+    def __init__(self, segments=6, with_words=True, delay=0.0):
+        self.segments = segments
+        self.with_words = with_words
+        self.delay = delay
+        self.decoded = 0
+
+    def transcribe(self, path, **kwargs):
+        assert os.path.exists(path)
+        self.path = path
+        return self._segments(), SimpleNamespace(duration=self.segments * 5.0)
+
+    def _segments(self):
+        for i in range(self.segments):
+            time.sleep(self.delay)
+            self.decoded += 1
+            words = [f"word{i}x{j}" for j in range(10)]
+            yield SimpleNamespace(
+                start=i * 5.0,
+                end=(i + 1) * 5.0,
+                text=" ".join(words),
+                words=[SimpleNamespace(word=w, start=i * 5.0 + j * 0.5) for j, w in enumerate(words)]
+                if self.with_words else None,
+            )
+
+
+@pytest.fixture(autouse=True)
+def stubs():
+    gemini_client.set_backend(lambda model_name, prompt: EPISODE)
+    yield
+    gemini_client.set_backend(None)
+    audio.set_model(None)
+
+
+def read_events(resp):
+    events = []
+    for block in resp.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_pushes_segments_then_result():
+    audio.set_model(FakeWhisper())
+    resp = TestClient(app).post("/generate/file/stream", files={"file": ("a.wav", b"x", "audio/wav")})
+    assert resp.status_code == 200
+    events = read_events(resp)
+    kinds = [e for e, _ in events]
+    assert kinds == ["segment"] * 6 + ["transcribed", "result"]
+    assert [d["progress"] for e, d in events if e == "segment"][-1] == 100.0
+    assert events[-2][1] == {"duration": 30.0, "word_count": 60}
+    assert events[-1][1]["title"] == "Episode"
+
+
+def test_stream_rejects_non_audio():
+    resp = TestClient(app).post("/generate/file/stream", files={"file": ("a.txt", b"x", "text/plain")})
+    assert resp.status_code == 422
+
+
+def test_stream_error_event_hides_internal_details():
+    def broken(model_name, prompt):
+        raise RuntimeError("secret backend detail")
+
+    gemini_client.set_backend(broken)
+    audio.set_model(FakeWhisper())
+    resp = TestClient(app).post("/generate/file/stream", files={"file": ("a.wav", b"x", "audio/wav")})
+    event, data = read_events(resp)[-1]
+    assert event == "error"
+    assert data["status"] == 500
+    assert "secret" not in data["detail"]
+
+
+@pytest.mark.parametrize("with_words", [True, False])
+def test_file_and_stream_share_transcription(with_words, tmp_path):
+    fake = FakeWhisper(with_words=with_words)
+    audio.set_model(fake)
+
+    async def collect():
+        path = tmp_path / "a.wav"
+        path.write_bytes(b"x")
+        done = None
+        async for ev in audio.stream_transcription(str(path)):
+            if ev["type"] == "done":
+                done = ev
+        return done
+
+    streamed = asyncio.run(collect())
+    assert not os.path.exists(fake.path)
+    if not with_words:
+        # Fallback: segment starts stand in for word timings
+        assert streamed["words"] == [(f"word{i}x0", i * 5.0) for i in range(6)]
+
+    resp = TestClient(app).post(
+        "/generate/file",
+        files={"file": ("a.wav", b"x", "audio/wav")},
+        data={"include_timestamps": "true"},
+    )
+    assert resp.status_code == 200
+    assert not os.path.exists(fake.path)
+    outro = [n for n in resp.json()["show_notes"] if n["note"] == "Outro"][0]
+    # Outro time comes from the last word timing, which both paths must agree on
+    last_start = streamed["words"][-1][1]
+    assert outro["time"] == hhmmss(last_start)
+
+
+def test_closing_stream_stops_decoding_and_removes_file(tmp_path):
+    fake = FakeWhisper(segments=50, delay=0.05)
+    audio.set_model(fake)
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"x")
+
+    async def consume_some():
+        agen = audio.stream_transcription(str(path))
+        seen = 0
+        async for ev in agen:
+            assert ev["type"] == "segment"
+            seen += 1
+            if seen == 3:
+                break
+        await agen.aclose()   # what a client disconnect does to the SSE generator
+        return seen
+
+    seen = asyncio.run(consume_some())
+    # Worker finishes at most the segment it was decoding when cancelled
+    deadline = time.monotonic() + 2.0
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not os.path.exists(path)
+    stopped_at = fake.decoded
+    time.sleep(0.3)
+    assert fake.decoded == stopped_at
+    assert stopped_at <= seen + 2
+    assert stopped_at < fake.segments
+
+
+def test_model_is_loaded_once_under_concurrent_first_use(monkeypatch):
+    built = []
+
+    class SlowModel:
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.1)
+            built.append(self)
+
+    monkeypatch.setattr(audio, "WhisperModel", SlowModel)
+    audio.set_model(None)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(audio._get_model())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
+    assert all(m is built[0] for m in models)
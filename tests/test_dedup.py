@@ -0,0 +1,147 @@
+import random
+import sqlite3
+
+import pytest
+
+from src.utils import dedup
+from src.utils.dedup import NearDupIndex
+
+PARAMS = "gemini-1.5-flash|1200|150|True"
+
+
+def make_text(seed: int, words: int = 300) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(50_000)}" for _ in range(words))
+
+
+def near_copy(text: str) -> str:
+    # syndicated copy: same story with a byline and a couple of edits
+    words = text.split()
+    words[100] = "edited"
+    return "By Staff Reporter " + " ".join(words) + " Follow us for more."
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = NearDupIndex(str(tmp_path / "dedup.sqlite"), threshold=0.8)
+    yield idx
+    idx.close()
+
+
+@pytest.fixture
+def global_index(tmp_path, monkeypatch):
+    idx = NearDupIndex(str(tmp_path / "global.sqlite"), threshold=0.8)
+    monkeypatch.setattr(dedup, "_index", idx)
+    yield idx
+    idx.close()
+
+
+def test_near_duplicate_is_found(index):
+    original = make_text(1)
+    doc_id = index.add(original)
+    matches = index.query(near_copy(original))
+    assert matches and matches[0][0] == doc_id
+    assert matches[0][1] >= 0.8
+
+
+def test_unrelated_doc_is_not_found(index):
+    index.add(make_text(1))
+    assert index.query(make_text(2)) == []
+
+
+def test_exact_text_is_indexed_once(index):
+    text = make_text(1)
+    assert index.add(text) == index.add(text)
+    assert len(index) == 1
+
+
+def test_results_persist_after_reopen(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    original = make_text(1)
+    idx = NearDupIndex(path)
+    idx.put_result(idx.add(original), PARAMS, {"title": "Stored"})
+    idx.close()
+
+    reopened = NearDupIndex(path)
+    try:
+        doc_id, _ = reopened.query(near_copy(original))[0]
+        assert reopened.get_result(doc_id, PARAMS) == {"title": "Stored"}
+    finally:
+        reopened.close()
+
+
+def test_reuse_returns_stored_result(global_index, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "reuse")
+    original = make_text(1)
+    dedup.remember(original, PARAMS, {"title": "Stored"})
+    assert dedup.find_reusable(near_copy(original), PARAMS) == {"title": "Stored"}
+    assert dedup.find_reusable(near_copy(original), "other|params") is None
+
+
+def test_reuse_skips_best_match_without_result_for_params(global_index, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "reuse")
+    original = make_text(1)
+    query = near_copy(original)
+    # The closest match has no result for PARAMS; a slightly further one does
+    global_index.add(query + " extra")
+    dedup.remember(original, PARAMS, {"title": "Stored"})
+    matches = global_index.query(query)
+    assert len(matches) == 2
+    assert dedup.find_reusable(query, PARAMS) == {"title": "Stored"}
+
+
+def test_warn_mode_returns_none(global_index, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "warn")
+    original = make_text(1)
+    dedup.remember(original, PARAMS, {"title": "Stored"})
+    assert dedup.find_reusable(near_copy(original), PARAMS) is None
+
+
+def test_off_mode_touches_nothing(global_index, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "off")
+    dedup.remember(make_text(1), PARAMS, {"title": "Stored"})
+    assert len(global_index) == 0
+
+
+def test_index_errors_never_fail_the_request(global_index, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "reuse")
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(global_index, "query", locked)
+    monkeypatch.setattr(global_index, "add", locked)
+    assert dedup.find_reusable(make_text(1), PARAMS) is None
+    dedup.remember(make_text(1), PARAMS, {"title": "Stored"})
+
+
+def test_signature_is_chunk_size_independent_and_capped(monkeypatch):
+    text = make_text(1, words=5000)
+    whole = dedup.minhash_signature(text)
+    monkeypatch.setattr(dedup, "_HASH_CHUNK", 7)
+    assert (dedup.minhash_signature(text) == whole).all()
+    # only the first MAX_TEXT_CHARS are fingerprinted, like the prompt
+    assert (dedup.minhash_signature(text + " " + make_text(2, words=5000)) == whole).all()
+
+
+def test_fallback_scaffold_is_not_stored(global_index, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.generation import gemini_client
+    from src.main import app
+
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "reuse")
+    monkeypatch.setattr(gemini_client, "JSON_RETRIES", 0)
+    answers = ["Sure! Here's your episode...", '{"title": "Real", "intro": "", "segments": [], "outro": ""}']
+    gemini_client.set_backend(lambda model_name, prompt: answers.pop(0))
+    try:
+        client = TestClient(app)
+        original = make_text(1)
+        first = client.post("/generate", json={"text": original})
+        assert first.json()["title"] == "Podcast Episode"
+        assert len(global_index) == 0
+
+        second = client.post("/generate", json={"text": near_copy(original)})
+        assert second.json()["title"] == "Real"
+        assert len(global_index) == 1
+    finally:
+        gemini_client.set_backend(None)
@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.generation import gemini_client
+
+SOURCE = "word " * 100
+
+GOOD = json.dumps({
+    "title": "T",
+    "intro": "I",
+    "segments": [{"heading": "H", "content": "C"}],
+    "outro": "O",
+    "show_notes": [],
+})
+
+
+@pytest.fixture(autouse=True)
+def reset_client(monkeypatch):
+    monkeypatch.setattr(gemini_client, "HEDGE_INITIAL_DELAY", 0.05)
+    monkeypatch.setattr(gemini_client, "HEDGE_BUDGET_PCT", 100.0)
+    gemini_client._latencies.clear()
+    gemini_client._hedge_stats.update(requests=0, hedges=0)
+    yield
+    gemini_client.set_backend(None)
+
+
+def fake_backend(responses):
+    """
+    responses: model_name -> list of (delay_sec, text or Exception), consumed in order.
+    """
+    calls = []
+    lock = threading.Lock()
+
+    def backend(model_name, prompt):
+        with lock:
+            calls.append((model_name, threading.current_thread().name))
+            delay, out = responses[model_name].pop(0)
+        time.sleep(delay)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    return backend, calls
+
+
+def test_no_hedge_runs_inline_in_caller_thread():
+    backend, calls = fake_backend({"primary": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(SOURCE, "primary", 100, hedge=False)
+    assert data["title"] == "T"
+    assert calls == [("primary", threading.current_thread().name)]
+
+
+def test_primary_wins_without_hedging():
+    backend, calls = fake_backend({"primary": [(0, GOOD)], "fallback": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(
+        SOURCE, "primary", 100, hedge=True, hedge_model="fallback"
+    )
+    assert data["title"] == "T"
+    assert [m for m, _ in calls] == ["primary"]
+
+
+def test_hedge_wins_when_primary_is_slow():
+    slow = json.dumps({"title": "slow"})
+    backend, calls = fake_backend({"primary": [(0.5, slow)], "fallback": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+    t0 = time.monotonic()
+    data = gemini_client.generate_structured_script(
+        SOURCE, "primary", 100, hedge=True, hedge_model="fallback"
+    )
+    assert data["title"] == "T"
+    assert time.monotonic() - t0 < 0.4
+    assert [m for m, _ in calls] == ["primary", "fallback"]
+
+
+def test_hedge_budget_exhausted_waits_for_primary(monkeypatch):
+    monkeypatch.setattr(gemini_client, "HEDGE_BUDGET_PCT", 0.0)
+    slow = json.dumps({"title": "slow"})
+    backend, calls = fake_backend({"primary": [(0.2, slow)], "fallback": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(
+        SOURCE, "primary", 100, hedge=True, hedge_model="fallback"
+    )
+    assert data["title"] == "slow"
+    assert [m for m, _ in calls] == ["primary"]
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_bad_json_is_reissued(hedge):
+    backend, calls = fake_backend({"primary": [(0, "not json"), (0, GOOD)]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(SOURCE, "primary", 100, hedge=hedge, retries=1)
+    assert data["title"] == "T"
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_retries_exhausted_returns_scaffold(hedge):
+    backend, calls = fake_backend({"primary": [(0, "nope"), (0, "still nope")]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(SOURCE, "primary", 100, hedge=hedge, retries=1)
+    assert data["title"] == "Podcast Episode"
+    assert data["segments"][0]["content"] == SOURCE[:600]
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_backend_error_is_reraised_when_every_call_fails(hedge):
+    backend, _ = fake_backend({
+        "primary": [(0.2, RuntimeError("primary down"))],
+        "fallback": [(0, RuntimeError("fallback down"))],
+    })
+    gemini_client.set_backend(backend)
+    with pytest.raises(RuntimeError):
+        gemini_client.generate_structured_script(
+            SOURCE, "primary", 100, hedge=hedge, hedge_model="fallback"
+        )
+
+
+def test_hedge_deadline_starts_when_primary_starts(monkeypatch):
+    # Saturate the primary pool so the next primary queues longer than the hedge delay
+    monkeypatch.setattr(gemini_client, "_executor", gemini_client.ThreadPoolExecutor(max_workers=1))
+    release = threading.Event()
+    gemini_client._executor.submit(release.wait)
+    backend, calls = fake_backend({"primary": [(0, GOOD)], "fallback": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    data = gemini_client.generate_structured_script(
+        SOURCE, "primary", 100, hedge=True, hedge_model="fallback"
+    )
+    timer.join()
+    assert data["title"] == "T"
+    assert [m for m, _ in calls] == ["primary"]
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_bad_json_is_reissued_to_the_model_that_failed(hedge):
+    backend, calls = fake_backend({"primary": [(0, "not json"), (0, GOOD)], "fallback": [(0, GOOD)]})
+    gemini_client.set_backend(backend)
+    data = gemini_client.generate_structured_script(
+        SOURCE, "primary", 100, hedge=hedge, hedge_model="fallback", retries=1
+    )
+    assert data["title"] == "T"
+    assert [m for m, _ in calls] == ["primary", "primary"]